@@ -4,7 +4,10 @@
 # dependencies = [
 #     "langchain>=0.3.0",
 #     "langchain-openai>=0.2.0",
+#     "msgspec>=0.18.0",
+#     "orjson>=3.10.0",
 #     "python-dotenv>=1.0.0",
+#     "tenacity>=8.2.0",
 # ]
 # ///
 """
@@ -19,25 +22,41 @@ Example:
 """
 
 import argparse
+import asyncio
 import csv
-import json
+import hashlib
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import msgspec
+import orjson
+
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from openai import RateLimitError
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 
 # Paths relative to this script
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent
 PROCESSED_DIR = SCRIPT_DIR.parent / "processed"
+CACHE_DIR = PROCESSED_DIR / "cache"
 SCHEMA_PATH = PROJECT_ROOT / "data" / "vocab_schema.json"
 OUTPUT_CSV = PROJECT_ROOT / "data" / "vocab.csv"
 
+_LESSON_FILE_RE = re.compile(r"genki_vocab_L(\d+)\.csv")
+
 
 def parse_lesson_arg(lesson_arg: str) -> list[str]:
     """Parse lesson argument into list of 2-digit lesson numbers.
@@ -55,8 +74,7 @@ def parse_lesson_arg(lesson_arg: str) -> list[str]:
 
 def load_schema() -> dict:
     """Load the vocabulary schema from JSON file."""
-    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(SCHEMA_PATH.read_bytes())
 
 
 def load_lesson_vocab(lesson_num: str) -> list[dict]:
@@ -65,21 +83,31 @@ def load_lesson_vocab(lesson_num: str) -> list[dict]:
     if not lesson_file.exists():
         raise FileNotFoundError(f"Lesson file not found: {lesson_file}")
 
-    vocab_items = []
-    with open(lesson_file, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            vocab_items.append(row)
-    return vocab_items
+    # csv.reader + dict(zip(...)) in a comprehension beats DictReader's
+    # per-row overhead; it compounds when preloading a whole lesson range
+    with open(lesson_file, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        fields = next(reader, None)
+        if fields is None:
+            return []
+        return [dict(zip(fields, row)) for row in reader]
+
+
+def _safe_load(lesson_num: str) -> list[dict] | None:
+    """load_lesson_vocab, returning None instead of raising for a missing file."""
+    try:
+        return load_lesson_vocab(lesson_num)
+    except FileNotFoundError:
+        return None
 
 
 def create_batch_prompt_template(schema: dict) -> ChatPromptTemplate:
     """Create the LangChain prompt template for batch vocab processing."""
 
-    # Extract relevant schema info for the prompt
-    columns_info = json.dumps(schema["columns"], ensure_ascii=False, indent=2)
-    verb_exceptions = json.dumps(schema["verb_exceptions"], ensure_ascii=False, indent=2)
-    irregular_verbs = json.dumps(schema["irregular_verbs"], ensure_ascii=False, indent=2)
+    # Extract relevant schema info for the prompt (compact JSON = fewer tokens)
+    columns_info = orjson.dumps(schema["columns"]).decode()
+    verb_exceptions = orjson.dumps(schema["verb_exceptions"]).decode()
+    irregular_verbs = orjson.dumps(schema["irregular_verbs"]).decode()
 
     template = """You are a Japanese language expert. Given a list of Japanese vocabulary words, generate complete flashcard entries for ALL of them according to the schema.
 
@@ -132,7 +160,40 @@ Return ONLY a valid JSON array, no other text. The array must have the same numb
     )
 
 
-def process_vocab_batch(llm, prompt_template, parser, items: list[dict]) -> list[dict]:
+@retry(
+    retry=retry_if_exception_type(RateLimitError),
+    wait=wait_random_exponential(min=1, max=60),
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+async def _invoke(chain, sem: asyncio.Semaphore, payload: dict, on_entries=None) -> list[dict]:
+    """Stream the chain with exponential-backoff retry on rate limits.
+
+    JsonOutputParser yields progressively larger partial parses as the
+    response streams in; every array element before the last is complete,
+    so those are handed to `on_entries` without waiting for the full
+    response. A retried attempt may re-emit entries, which is safe because
+    the CSV writer deduplicates. The semaphore is acquired inside the
+    retried coroutine, so a slot is released while a batch sleeps between
+    attempts.
+    """
+    async with sem:
+        result = []
+        emitted = 0
+        async for partial in chain.astream(payload):
+            if not isinstance(partial, list):
+                continue
+            result = partial
+            complete = len(result) - 1  # last element may still be mid-generation
+            if on_entries is not None and complete > emitted:
+                await on_entries(result[emitted:complete])
+                emitted = complete
+        if on_entries is not None and len(result) > emitted:
+            await on_entries(result[emitted:])
+        return result
+
+
+async def process_vocab_batch(chain, sem: asyncio.Semaphore, items: list[dict], on_entries=None) -> list[dict]:
     """Process a batch of vocabulary items through the LLM."""
 
     # Prepare items for the prompt
@@ -150,15 +211,78 @@ def process_vocab_batch(llm, prompt_template, parser, items: list[dict]) -> list
             "english": english
         })
 
-    vocab_items_json = json.dumps(vocab_list, ensure_ascii=False, indent=2)
+    vocab_items_json = orjson.dumps(vocab_list).decode()
 
-    chain = prompt_template | llm | parser
-
-    result = chain.invoke({"vocab_items_json": vocab_items_json})
+    result = await _invoke(chain, sem, {"vocab_items_json": vocab_items_json}, on_entries)
 
     return result
 
 
+def _batch_cache_path(lesson_num: str, batch: list[dict]) -> Path:
+    """Cache path keyed by the batch's content, not its position.
+
+    Dedup and the already-written prefilter change how surviving words
+    are re-batched on a rerun, so a positional key (lesson + batch index)
+    would let a recomposed batch collide with a stale file and silently
+    skip its items. Hashing the items themselves makes a changed batch a
+    cache miss.
+    """
+    digest = hashlib.sha1(orjson.dumps(batch)).hexdigest()[:12]
+    return CACHE_DIR / f"L{lesson_num}_{digest}.msgpack"
+
+
+async def _run_all(chain, batches, csv_writer, concurrency: int, dry_run: bool, use_cache: bool) -> int:
+    """Dispatch all batches concurrently, bounded by a semaphore.
+
+    `batches` is a list of (lesson_num, batch_num, total_batches, batch) tuples.
+    Returns the total number of entries processed. CSV writes happen under a
+    lock so batches still land in vocab.csv one at a time.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+
+    async def _write_entries(entries):
+        async with write_lock:
+            csv_writer.write_entries(entries)
+
+    async def _run_batch(lesson_num, batch_num, total_batches, batch):
+        # In a real run, completed entries are appended to the CSV while
+        # the rest of the response is still streaming
+        on_entries = None if dry_run else _write_entries
+
+        # Cached results from an earlier run short-circuit the API call,
+        # making reruns after a crash idempotent and free
+        cache_path = _batch_cache_path(lesson_num, batch) if use_cache else None
+        if cache_path is not None and cache_path.exists():
+            results = msgspec.msgpack.decode(cache_path.read_bytes())
+            if on_entries is not None:
+                await on_entries(results)
+        else:
+            results = await process_vocab_batch(chain, sem, batch, on_entries)
+            if cache_path is not None:
+                cache_path.write_bytes(msgspec.msgpack.encode(results))
+
+        async with write_lock:
+            if dry_run:
+                print(f"Lesson {lesson_num} batch {batch_num + 1}/{total_batches} ({len(batch)} items):")
+                for entry in results:
+                    print(f"  - {entry.get('kanji')} ({entry.get('reading')}): {entry.get('english')}")
+            else:
+                print(f"Lesson {lesson_num} batch {batch_num + 1}/{total_batches} ✓ ({len(results)} processed)")
+        return len(results)
+
+    tasks = [_run_batch(*spec) for spec in batches]
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+    total_processed = 0
+    for (lesson_num, batch_num, total_batches, _), outcome in zip(batches, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"Lesson {lesson_num} batch {batch_num + 1}/{total_batches} ✗ Error: {outcome}")
+        else:
+            total_processed += outcome
+    return total_processed
+
+
 class VocabCSVWriter:
     """Handles incremental writing to vocab.csv with duplicate detection."""
 
@@ -174,6 +298,10 @@ class VocabCSVWriter:
         self.skipped_count = 0
         self._ensure_header()
         self._load_existing()
+        # Keep the output file open for the writer's lifetime; one
+        # open/close syscall pair total instead of one per batch.
+        self._fh = open(OUTPUT_CSV, "a", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._fh, fieldnames=self.FIELDNAMES)
 
     def _ensure_header(self):
         """Ensure CSV file exists with header."""
@@ -184,37 +312,51 @@ class VocabCSVWriter:
 
     def _load_existing(self):
         """Load existing entries for duplicate detection."""
-        with open(OUTPUT_CSV, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                key = (row.get("Kanji", ""), row.get("Reading (Kana)", ""))
-                self.existing_entries.add(key)
+        # csv.reader + tuple indexing avoids DictReader's per-row dict
+        # allocation; only the two key columns are needed.
+        with open(OUTPUT_CSV, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            ki = header.index("Kanji")
+            ri = header.index("Reading (Kana)")
+            self.existing_entries = {
+                (row[ki], row[ri]) for row in reader if len(row) > max(ki, ri)
+            }
 
     def write_entries(self, entries: list[dict]):
         """Append entries to CSV immediately."""
-        with open(OUTPUT_CSV, "a", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
-
-            for entry in entries:
-                key = (entry.get("kanji", ""), entry.get("reading", ""))
-                if key in self.existing_entries:
-                    self.skipped_count += 1
-                    continue
+        # Collect non-duplicate rows first, then emit them with a single
+        # writerows call (one Python->C transition per batch, not per row)
+        to_write = []
+        for entry in entries:
+            key = (entry.get("kanji", ""), entry.get("reading", ""))
+            if key in self.existing_entries:
+                self.skipped_count += 1
+                continue
 
-                row = {
-                    "Kanji": entry.get("kanji", ""),
-                    "Reading (Kana)": entry.get("reading", ""),
-                    "English": entry.get("english", ""),
-                    "Part of Speech": entry.get("pos", ""),
-                    "Polite (Masu-form)": entry.get("polite", ""),
-                    "Te-form": entry.get("te_form", ""),
-                    "Short Negative (Nai)": entry.get("negative", ""),
-                    "Short Past (Ta)": entry.get("past", ""),
-                    "Usage/Notes": entry.get("notes", "")
-                }
-                writer.writerow(row)
-                self.existing_entries.add(key)
-                self.added_count += 1
+            to_write.append({
+                "Kanji": entry.get("kanji", ""),
+                "Reading (Kana)": entry.get("reading", ""),
+                "English": entry.get("english", ""),
+                "Part of Speech": entry.get("pos", ""),
+                "Polite (Masu-form)": entry.get("polite", ""),
+                "Te-form": entry.get("te_form", ""),
+                "Short Negative (Nai)": entry.get("negative", ""),
+                "Short Past (Ta)": entry.get("past", ""),
+                "Usage/Notes": entry.get("notes", "")
+            })
+            self.existing_entries.add(key)
+
+        if to_write:
+            self._writer.writerows(to_write)
+            self.added_count += len(to_write)
+        self._fh.flush()
+
+    def close(self):
+        """Close the underlying CSV file handle."""
+        self._fh.close()
 
     def summary(self) -> str:
         return f"Added {self.added_count} entries, skipped {self.skipped_count} duplicates"
@@ -241,11 +383,22 @@ def main():
         default=20,
         help="Number of items to process per API call (default: 20)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent API calls (default: 8)"
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Process items but don't write to CSV"
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache LLM results per batch so reruns skip completed API calls"
+    )
 
     args = parser.parse_args()
 
@@ -258,8 +411,19 @@ def main():
         print("Error: OPENAI_API_KEY environment variable not set")
         sys.exit(1)
 
-    # Parse lesson argument
+    # Parse lesson argument and drop lessons with no processed file;
+    # one directory scan replaces a stat call per requested lesson
     lesson_nums = parse_lesson_arg(args.lesson)
+    with os.scandir(PROCESSED_DIR) as entries:
+        present = {
+            m.group(1)
+            for m in (_LESSON_FILE_RE.fullmatch(e.name) for e in entries)
+            if m
+        }
+    missing = [n for n in lesson_nums if n not in present]
+    if missing:
+        print(f"Warning: no lesson file for: {', '.join(missing)}")
+    lesson_nums = [n for n in lesson_nums if n in present]
     print(f"Processing lessons: {', '.join(lesson_nums)}")
 
     print(f"Loading schema from {SCHEMA_PATH}")
@@ -269,50 +433,74 @@ def main():
     llm = ChatOpenAI(model=args.model, temperature=0)
     prompt_template = create_batch_prompt_template(schema)
     json_parser = JsonOutputParser()
+    # Build the runnable chain once; every batch reuses it
+    chain = prompt_template | llm | json_parser
 
     # Initialize CSV writer (unless dry run)
     csv_writer = None if args.dry_run else VocabCSVWriter()
-    grand_total_processed = 0
     grand_total_items = 0
 
-    for lesson_num in lesson_nums:
-        print(f"\n{'='*50}")
-        print(f"Lesson {lesson_num}")
-        print('='*50)
-
-        try:
-            vocab_items = load_lesson_vocab(lesson_num)
-        except FileNotFoundError as e:
-            print(f"Skipping: {e}")
-            continue
-
-        print(f"Found {len(vocab_items)} vocabulary items")
-        grand_total_items += len(vocab_items)
-
-        # Process in batches
-        total_batches = (len(vocab_items) + args.batch_size - 1) // args.batch_size
-        for batch_num in range(total_batches):
-            start_idx = batch_num * args.batch_size
-            end_idx = min(start_idx + args.batch_size, len(vocab_items))
-            batch = vocab_items[start_idx:end_idx]
-
-            print(f"Processing batch {batch_num + 1}/{total_batches} ({len(batch)} items)...", end=" ", flush=True)
-
-            try:
-                results = process_vocab_batch(llm, prompt_template, json_parser, batch)
-                grand_total_processed += len(results)
-
-                if args.dry_run:
-                    for entry in results:
-                        print(f"\n  - {entry.get('kanji')} ({entry.get('reading')}): {entry.get('english')}", end="")
-                    print(" ✓")
-                else:
-                    csv_writer.write_entries(results)
-                    print(f"✓ ({len(results)} written)")
-            except Exception as e:
-                print(f"✗ Error: {e}")
+    try:
+        # Collect all batches across lessons, then dispatch them concurrently.
+        # Review words reappear in later lessons; a global seen-set keeps
+        # each (word, kanji) pair from being sent to the API twice.
+        batches = []
+        seen_inputs = set()
+        existing_entries = csv_writer.existing_entries if csv_writer else set()
+
+        # Preload all lesson files with a small thread pool; the GIL is
+        # released around file reads, so the disk I/O overlaps
+        loaded = {}
+        if lesson_nums:
+            with ThreadPoolExecutor(max_workers=min(8, len(lesson_nums))) as ex:
+                loaded = dict(zip(lesson_nums, ex.map(_safe_load, lesson_nums)))
+
+        for lesson_num, vocab_items in loaded.items():
+            if vocab_items is None:
+                print(f"Skipping lesson {lesson_num}: file disappeared")
                 continue
 
+            unique_items = []
+            skipped = 0
+            for item in vocab_items:
+                word_kana = item.get("単語", "")
+                key = (word_kana, item.get("漢字表記", ""))
+                if key in seen_inputs:
+                    skipped += 1
+                    continue
+                seen_inputs.add(key)
+                # Exact prefilter against entries already in vocab.csv,
+                # using the same kanji-form fallback the prompt uses. The
+                # LLM sometimes normalizes kanji, so near-matches still
+                # get caught by the writer later - but exact repeats never
+                # reach the API on a rerun.
+                kanji_form = item.get("漢字表記", "") or word_kana
+                if (kanji_form, word_kana) in existing_entries:
+                    skipped += 1
+                    continue
+                unique_items.append(item)
+
+            skip_note = f" ({skipped} duplicate(s) skipped)" if skipped else ""
+            print(f"Lesson {lesson_num}: {len(unique_items)} vocabulary items{skip_note}")
+            grand_total_items += len(unique_items)
+
+            total_batches = (len(unique_items) + args.batch_size - 1) // args.batch_size
+            for batch_num in range(total_batches):
+                start_idx = batch_num * args.batch_size
+                end_idx = min(start_idx + args.batch_size, len(unique_items))
+                batches.append((lesson_num, batch_num, total_batches, unique_items[start_idx:end_idx]))
+
+        print(f"\nDispatching {len(batches)} batch(es) with concurrency {args.concurrency}...")
+        if args.cache:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+        grand_total_processed = asyncio.run(_run_all(
+            chain, batches, csv_writer, args.concurrency, args.dry_run, args.cache
+        ))
+    finally:
+        if csv_writer:
+            csv_writer.close()
+
     print(f"\n{'='*50}")
     print(f"Successfully processed {grand_total_processed}/{grand_total_items} items across {len(lesson_nums)} lesson(s)")
     if csv_writer:
@@ -1,16 +1,26 @@
-#!/usr/bin/env python3
+#!/usr/bin/env -S uv run
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "httpx[http2]>=0.27.0",
+#     "python-dotenv>=1.0.0",
+# ]
+# ///
 from dotenv import load_dotenv
 import os
-import requests
+import httpx
 
 load_dotenv(os.path.dirname(__file__) + "/.env")
 key = os.getenv("OPENAI_API_KEY")
 print(f"Key loaded: {key[:20]}...")
 
-r = requests.post(
-    "https://api.openai.com/v1/chat/completions",
-    headers={"Authorization": f"Bearer {key}"},
-    json={"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
-)
+# Reusing one client keeps the TCP+TLS connection alive across calls,
+# and HTTP/2 multiplexes any concurrent requests over it.
+with httpx.Client(http2=True, timeout=60) as client:
+    r = client.post(
+        "https://api.openai.com/v1/chat/completions",
+        headers={"Authorization": f"Bearer {key}"},
+        json={"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+    )
 print(f"Status: {r.status_code}")
 print(r.json())